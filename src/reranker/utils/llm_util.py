@@ -5,7 +5,7 @@ import json
 import math
 from beir.retrieval.evaluation import EvaluateRetrieval
 from .result import Result, ResultsLoader
-from .rankllm import PromptMode, RankLLM
+from .rankllm import MAX_IN_FLIGHT, NUM_PARALLEL, PromptMode, RankLLM
 from .reranker import Reranker
 from .rank_listwise_os_llm import RankListwiseOSLLM
 from .rank_gpt import SafeOpenai
@@ -183,7 +183,10 @@ def rerank_beir_outputs_llm(reranker, results_for_rerank, use_logits, use_alpha,
         code_prompt_type (str): For code reranking, whether to use "docstring" or "github_issue" prompts
     """
 
+    num_parallel = 1
     if isinstance(reranker._agent, SafeOpenai):
+        # API calls are I/O bound, so queries are reranked concurrently instead of batched
+        num_parallel = NUM_PARALLEL
         if batched:
             logging.warning(msg="You attempted batched reranking with API-based model, which is not supported. Setting batched to 'False'")
         batched=False
@@ -196,7 +199,7 @@ def rerank_beir_outputs_llm(reranker, results_for_rerank, use_logits, use_alpha,
         reranker._agent._history = []
 
     # Reinit current cost at the start of new run
-    if hasattr(reranker._agent, "_curr_cost"):
+    if reranker._agent._tracks_cost:
         reranker._agent._curr_cost = 0
 
     # Perform reranking
@@ -209,7 +212,9 @@ def rerank_beir_outputs_llm(reranker, results_for_rerank, use_logits, use_alpha,
         window_size=window_size,
         step=step_size,
         logging=False,
-        batched=batched
+        batched=batched,
+        num_parallel=num_parallel,
+        max_in_flight=MAX_IN_FLIGHT,
     )
 
     for result in reranked_results:
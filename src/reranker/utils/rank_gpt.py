@@ -1,5 +1,6 @@
 import json
 import time
+import asyncio
 import random
 import openai
 import tiktoken
@@ -79,6 +80,7 @@ class SafeOpenai(RankLLM):
         self._code_prompt_type = code_prompt_type
         self._acc_cost = 0
         self._curr_cost = 0
+        self._tracks_cost = True
 
         self._keys = keys
         self._cur_key_id = key_start_id or 0
@@ -94,12 +96,49 @@ class SafeOpenai(RankLLM):
             openai.api_type = api_type
             openai.api_base = api_base
             self.use_azure_ai = True
+        # One async client per API key, created lazily by _get_async_client and closed after each concurrent run
+        self._async_clients = {}
+
+        # System message and few-shot examples are fixed once, so every prompt starts with the same
+        # messages and OpenAI's automatic prompt caching can reuse them across windows and queries
+        prefix_messages = []
+        if self._system_message:
+            prefix_messages.append({"role": "system", "content": self._system_message})
+        self._cached_prefix = self._add_few_shot_examples_messages(prefix_messages)
 
     class CompletionMode(Enum):
         UNSPECIFIED = 0
         CHAT = 1
         TEXT = 2
 
+    def _get_usage_cost(self, usage) -> Tuple[float, int]:
+        """Returns the cost of a completion and the number of prompt tokens served from OpenAI's prompt cache."""
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+        cost = (
+            self.cost_per_1k_token(input_token=True)*(usage.prompt_tokens - cached_tokens)
+            + self.cost_per_1k_cached_token()*cached_tokens
+            + self.cost_per_1k_token(input_token=False)*usage.completion_tokens
+        )/1000
+        return cost, cached_tokens
+
+    def _handle_completion_error(self, e: Exception) -> Optional[str]:
+        """
+        Classifies an exception raised by a completion call. Returns the error response for errors that
+        retrying cannot fix; otherwise switches to the next API key and returns None so the call is retried.
+        """
+        print("Error in completion call")
+        print(str(e))
+        if "This model's maximum context length is" in str(e):
+            print("reduce_length")
+            return "ERROR::reduce_length"
+        if "The response was filtered" in str(e):
+            print("The response was filtered")
+            return "ERROR::The response was filtered"
+        self._cur_key_id = (self._cur_key_id + 1) % len(self._keys)
+        openai.api_key = self._keys[self._cur_key_id]
+        return None
+
     def _call_completion(
         self,
         *args,
@@ -109,6 +148,7 @@ class SafeOpenai(RankLLM):
         **kwargs,
     ) -> Union[str, Dict[str, Any]]:
         cost=0
+        cached_tokens=0
         while True:
             try:
                 if completion_mode == self.CompletionMode.CHAT:
@@ -121,19 +161,12 @@ class SafeOpenai(RankLLM):
                     raise ValueError(
                         "Unsupported completion mode: %V" % completion_mode
                     )
-                cost = (self.cost_per_1k_token(input_token=True)*completion.usage.prompt_tokens + self.cost_per_1k_token(input_token=False)*completion.usage.completion_tokens)/1000
+                cost, cached_tokens = self._get_usage_cost(completion.usage)
                 break
             except Exception as e:
-                print("Error in completion call")
-                print(str(e))
-                if "This model's maximum context length is" in str(e):
-                    print("reduce_length")
-                    return "ERROR::reduce_length"
-                if "The response was filtered" in str(e):
-                    print("The response was filtered")
-                    return "ERROR::The response was filtered"
-                self._cur_key_id = (self._cur_key_id + 1) % len(self._keys)
-                openai.api_key = self._keys[self._cur_key_id]
+                error_response = self._handle_completion_error(e)
+                if error_response is not None:
+                    return error_response, cost, cached_tokens
                 time.sleep(0.1)
         if return_text:
             completion = (
@@ -141,55 +174,91 @@ class SafeOpenai(RankLLM):
                 if completion_mode == self.CompletionMode.CHAT
                 else completion.choices[0].text
             )
-        return completion, cost
+        return completion, cost, cached_tokens
+
+    def _get_async_client(self) -> Union[openai.AsyncOpenAI, openai.AsyncAzureOpenAI]:
+        key = self._keys[self._cur_key_id]
+        if key not in self._async_clients:
+            if self.use_azure_ai:
+                self._async_clients[key] = openai.AsyncAzureOpenAI(
+                    api_key=key, api_version=openai.api_version, azure_endpoint=openai.api_base
+                )
+            else:
+                self._async_clients[key] = openai.AsyncOpenAI(api_key=key)
+        return self._async_clients[key]
+
+    async def close_async_clients(self) -> None:
+        # The clients' pooled connections are bound to the event loop of the run that created them
+        clients, self._async_clients = self._async_clients, {}
+        for client in clients.values():
+            await client.close()
+
+    async def _call_completion_async(
+        self,
+        *args,
+        return_text=False,
+        **kwargs,
+    ) -> Union[str, Dict[str, Any]]:
+        """Async counterpart of `_call_completion` for chat completions."""
+        cost=0
+        cached_tokens=0
+        while True:
+            try:
+                completion = await self._get_async_client().chat.completions.create(
+                    *args, **kwargs, timeout=30
+                )
+                cost, cached_tokens = self._get_usage_cost(completion.usage)
+                break
+            except Exception as e:
+                error_response = self._handle_completion_error(e)
+                if error_response is not None:
+                    return error_response, cost, cached_tokens
+                await asyncio.sleep(0.1)
+        if return_text:
+            completion = completion.choices[0].message.content
+        return completion, cost, cached_tokens
+
+    def _get_model_kwargs(self) -> Dict[str, Any]:
+        if self._model == "o4-mini":
+            return {"model": self._model, "reasoning_effort": "low"}
+        return {"model": self._model, "temperature": 0}
+
+    def _record_completion(self, prompt, response: str, cost: float) -> int:
+        """Accumulates the cost of a completion, records it in the history and returns its number of tokens."""
+        self._acc_cost += cost
+        self._curr_cost += cost
+        try:
+            encoding = tiktoken.get_encoding(self._model)
+        except:
+            encoding = tiktoken.get_encoding("cl100k_base")
+
+        # Update history
+        self._history.append({
+            "prompt": prompt,
+            "response": response,
+        })
+        return len(encoding.encode(response))
 
     def run_llm(
         self, prompt: str, current_window_size: Optional[int] = None, use_logits: bool = False, use_alpha: bool = False
-    ) -> Tuple[str, int]:
-        model_key = "model"
-        if self._model == "o4-mini":
-            response, cost = self._call_completion(
-                messages=prompt,
-                completion_mode=SafeOpenai.CompletionMode.CHAT,
-                return_text=True,
-                **{
-                    model_key: self._model,
-                    "reasoning_effort": "low"},
-            )
-            self._acc_cost += cost
-            self._curr_cost += cost
-            try:
-                encoding = tiktoken.get_encoding(self._model)
-            except:
-                encoding = tiktoken.get_encoding("cl100k_base")
-
-            # Update history
-            self._history.append({
-                "prompt": prompt,
-                "response": response,
-            })
-            return response, len(encoding.encode(response))
-        else:
-            response, cost = self._call_completion(
-                messages=prompt,
-                temperature=0,
-                completion_mode=SafeOpenai.CompletionMode.CHAT,
-                return_text=True,
-                **{model_key: self._model},
-            )
-            self._acc_cost += cost
-            self._curr_cost += cost
-            try:
-                encoding = tiktoken.get_encoding(self._model)
-            except:
-                encoding = tiktoken.get_encoding("cl100k_base")
+    ) -> Tuple[str, int, int, float]:
+        response, cost, cached_tokens = self._call_completion(
+            messages=prompt,
+            completion_mode=SafeOpenai.CompletionMode.CHAT,
+            return_text=True,
+            **self._get_model_kwargs(),
+        )
+        return response, self._record_completion(prompt, response, cost), cached_tokens, cost
 
-            # Update history
-            self._history.append({
-                "prompt": prompt,
-                "response": response,
-            })
-            return response, len(encoding.encode(response))
+    async def run_llm_async(
+        self, prompt: str, current_window_size: Optional[int] = None, use_logits: bool = False, use_alpha: bool = False
+    ) -> Tuple[str, int, int, float]:
+        response, cost, cached_tokens = await self._call_completion_async(
+            messages=prompt,
+            return_text=True,
+            **self._get_model_kwargs(),
+        )
+        return response, self._record_completion(prompt, response, cost), cached_tokens, cost
 
     def _add_prefix_prompt(self, use_alpha, query: str, num: int) -> str:
         if self._rerank_type == "code":
@@ -307,10 +376,7 @@ class SafeOpenai(RankLLM):
         max_doc_length = 1024 if self._rerank_type == "code" else 300
         min_doc_length = 300
         while True:
-            messages = list()
-            if self._system_message:
-                messages.append({"role": "system", "content": self._system_message})
-            messages = self._add_few_shot_examples_messages(messages)
+            messages = list(self._cached_prefix)
             truncated_query = query[:int(max_query_len*4)]
             prefix = self._add_prefix_prompt(use_alpha, query, num)
             rank = 0
@@ -393,5 +459,28 @@ class SafeOpenai(RankLLM):
         }
         return cost_dict[self._model]
 
+    def num_cached_prefix_tokens(self) -> int:
+        if not self._cached_prefix:
+            return 0
+        # get_num_tokens adds the reply priming tokens, which only follow the last message of a full prompt
+        prefix_tokens = self.get_num_tokens(self._cached_prefix) - 3
+        # OpenAI only caches prompts of at least 1024 tokens, and the cached part grows in 128 token increments
+        if prefix_tokens < 1024:
+            return 0
+        return prefix_tokens // 128 * 128
+
+    def cost_per_1k_cached_token(self) -> float:
+        # Cached input pricing from https://openai.com/api/pricing
+        cost_dict = {
+            "gpt-4o-mini": 0.000075,
+            "gpt-4o": 0.00125,
+            "gpt-4.1": 0.0005,
+            "o1": 0.0075,
+            "o1-mini": 0.00055,
+            "o3-mini": 0.00055,
+            "o4-mini": 0.000275,
+        }
+        return cost_dict[self._model]
+
     def get_name(self) -> str:
         return self._model
\ No newline at end of file
@@ -46,7 +46,7 @@ class RankListwiseOSLLM(RankLLM):
                 f"Unsupported prompt mode: {prompt_mode}. Only RANK_GPT is supported."
             )
 
-        self._llm = LLM(model=model, max_logprobs=30, enforce_eager=False, gpu_memory_utilization=0.9, max_model_len=32768, trust_remote_code=True, enable_chunked_prefill=True, tensor_parallel_size=1)
+        self._llm = LLM(model=model, max_logprobs=30, enforce_eager=False, gpu_memory_utilization=0.9, max_model_len=32768, trust_remote_code=True, enable_chunked_prefill=True, enable_prefix_caching=True, tensor_parallel_size=1)
         self._tokenizer = self._llm.get_tokenizer()
         self.system_message_supported = "system" in self._tokenizer.chat_template
         self._batched = batched
@@ -61,6 +61,19 @@ class RankListwiseOSLLM(RankLLM):
             with open("data/output_v2_aug_filtered.jsonl", "r") as json_file:
                 self._examples = list(json_file)[1:-1]
 
+        # System message and few-shot examples are fixed once, so every prompt shares a byte-identical
+        # prefix that vLLM's prefix caching can reuse across windows and queries
+        self._cached_prefix = self._add_few_shot_examples_messages([])
+        if self._system_message:
+            if self.system_message_supported:
+                self._cached_prefix.insert(0, {"role": "system", "content": self._system_message})
+            elif self._cached_prefix:
+                # Without a system role the system message is merged into the first message, as in create_prompt
+                self._cached_prefix[0] = {
+                    **self._cached_prefix[0],
+                    "content": self._system_message + "\n " + self._cached_prefix[0]["content"],
+                }
+
     def _evaluate_logits(self, logits: Dict[str, 'Logit'], use_alpha: bool, total: Tuple[int, int]) -> Tuple[str, Dict[int, float]]:
         if use_alpha:
             evaluations = {
@@ -130,7 +143,7 @@ class RankListwiseOSLLM(RankLLM):
                 temperature=temp,
                 max_tokens=self.get_total_output_tokens(use_alpha, current_window_size),
             )
-            output = self._llm.generate([prompt], sampling_params=params, use_tqdm=True)[0]
+            output = self._llm.generate([prompt], sampling_params=params, use_tqdm=False)[0]
             output_text = output.outputs[0].text.replace(self._tokenizer.eos_token, "")
             self._history.append({
                 "prompt": prompt,
@@ -138,7 +151,7 @@ class RankListwiseOSLLM(RankLLM):
                 "second_run": {}
             })
 
-            return output_text, len(output_text)
+            return output_text, len(output_text), output.num_cached_tokens or 0
 
     def run_llm_batched(
         self,
@@ -187,7 +200,7 @@ class RankListwiseOSLLM(RankLLM):
             )
             outputs = self._llm.generate(prompts, sampling_params=params, use_tqdm=True)
             return [
-                (output.outputs[0].text, len(output.outputs[0].token_ids))
+                (output.outputs[0].text, len(output.outputs[0].token_ids), output.num_cached_tokens or 0)
                 for output in outputs
             ]
 
@@ -300,10 +313,7 @@ class RankListwiseOSLLM(RankLLM):
         max_doc_length = 1024 if (self._rerank_type == "code") else 300
         min_doc_length = 300
         while True:
-            messages = list()
-            if self._system_message and self.system_message_supported:
-                messages.append({"role": "system", "content": self._system_message})
-            messages = self._add_few_shot_examples_messages(messages)
+            messages = list(self._cached_prefix)
             query_tokens = self._tokenizer.tokenize(query)[:int(max_query_len)]
             truncated_query = self._tokenizer.convert_tokens_to_string(query_tokens)
             prefix = self._add_prefix_prompt(use_alpha, truncated_query, num)
@@ -326,8 +336,9 @@ class RankListwiseOSLLM(RankLLM):
                     input_context += f"[{identifier}] {self._replace_number(content, use_alpha)}\n"
             input_context += self._add_post_prompt(use_alpha, truncated_query, num)
             messages.append({"role": "user", "content": input_context})
-            if self._system_message and not self.system_message_supported:
-                messages[0]["content"] = self._system_message + "\n " + messages[0]["content"]
+            if self._system_message and not self.system_message_supported and not self._cached_prefix:
+                # Otherwise the system message is already merged into the first prefix message
+                messages[0] = {**messages[0], "content": self._system_message + "\n " + messages[0]["content"]}
             prompt = self._tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
             prompt = fix_text(prompt)
             num_tokens = self.get_num_tokens(prompt)
@@ -356,24 +367,24 @@ class RankListwiseOSLLM(RankLLM):
         rank_start: int,
         rank_end: int,
         batch_size: int = 32,
-    ) -> List[Tuple[str, int]]:
+    ) -> Tuple[List[str], List[int]]:
         def chunks(lst, n):
             """Yield successive n-sized chunks from lst."""
             for i in range(0, len(lst), n):
                 yield lst[i : i + n]
 
-        all_completed_prompts = []
+        prompt_texts = []
+        in_token_counts = []
 
         with ThreadPoolExecutor() as executor:
             for batch in chunks(results, batch_size):
-                completed_prompts = list(
-                    executor.map(
-                        lambda result: self.create_prompt(result, use_alpha, rank_start, rank_end),
-                        batch,
-                    )
-                )
-                all_completed_prompts.extend(completed_prompts)
-        return all_completed_prompts
+                for prompt, num_tokens in executor.map(
+                    lambda result: self.create_prompt(result, use_alpha, rank_start, rank_end),
+                    batch,
+                ):
+                    prompt_texts.append(prompt)
+                    in_token_counts.append(num_tokens)
+        return prompt_texts, in_token_counts
 
     def get_num_tokens(self, prompt: str) -> int:
         return len(self._tokenizer.encode(prompt))
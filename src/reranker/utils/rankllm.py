@@ -1,16 +1,47 @@
-
-
-import copy
+import asyncio
+import json
+import logging
+import os
 import random
 import re
 from abc import ABC, abstractmethod
+from collections import defaultdict, deque
 from enum import Enum
-from typing import Any, Dict, List, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 from tqdm import tqdm
 
 from .result import RankingExecInfo, Result
+logger = logging.getLogger(__name__)
+
 ALPH_START_IDX = ord('A')-1
+# Number of queries reranked concurrently by the async sliding window path (cf. OLLAMA_NUM_PARALLEL)
+NUM_PARALLEL = int(os.environ.get("RERANK_NUM_PARALLEL", 8))
+# Maximum number of windows submitted per round by the batched sliding window path, 0 submits every queued window
+MAX_IN_FLIGHT = int(os.environ.get("RERANK_MAX_IN_FLIGHT", 0)) or None
+
+_RANKED_LIST_RE = re.compile(r"\s*(\[\d+\](?:\s*>\s*\[\d+\])*)\s*")
+_RANKED_LIST_RE_MULTI = re.compile(_RANKED_LIST_RE.pattern, re.DOTALL | re.MULTILINE)
+_REPLACE_NUM_RE = re.compile(r"\[(\d+)\]")
+_REPLACE_ALPHA_RE = re.compile(r"\[([A-z]+)\]")
+_NUMBER_RE = re.compile(r"\d+")
+
+class _TranslationTable(dict):
+    """
+    Mapping for `str.translate` that computes entries on first use, so it covers all of Unicode
+    while lookups for characters already seen stay in C.
+    """
+
+    def __init__(self, translate_char, prefill: int = 128):
+        super().__init__()
+        self._translate_char = translate_char
+        for i in range(prefill):
+            self[i]
+
+    def __missing__(self, key: int) -> str:
+        value = self[key] = self._translate_char(chr(key))
+        return value
+
 
 class PromptMode(Enum):
     UNSPECIFIED = "unspecified"
@@ -34,6 +65,16 @@ class RankLLM(ABC):
         self._prompt_mode = prompt_mode
         self._num_few_shot_examples = num_few_shot_examples
         self._history = []
+        # Set by subclasses that accumulate API cost in _acc_cost / _curr_cost
+        self._tracks_cost = False
+        # Chat messages (system message and few-shot examples) that start every prompt, set by subclasses.
+        # Keeping them byte-identical lets backends reuse their KV cache / prompt cache across windows.
+        self._cached_prefix: Optional[List[Dict[str, str]]] = None
+        # Translation tables used by _clean_response to keep the per-character work out of Python
+        self._digit_table = _TranslationTable(lambda c: c if c.isdigit() else " ")
+        self._alpha_table = _TranslationTable(
+            lambda c: str(ord(c) - ALPH_START_IDX) if c.isalpha() else " "
+        )
 
     def max_tokens(self) -> int:
         """
@@ -54,13 +95,48 @@ class RankLLM(ABC):
 
         Returns:
             Tuple[str, int]: A tuple object containing the text response and the number of tokens in the response.
+                Backends that report prompt caching may append the number of cached input tokens as a third element,
+                and backends that track API cost may append the cost of the call as a fourth.
+        """
+        pass
+
+    async def run_llm_async(
+        self, prompt: Union[str, List[Dict[str, str]]], **kwargs
+    ) -> Tuple[str, int]:
+        """
+        Runs the target language model asynchronously with a passed in prompt.
+
+        Subclasses backed by an API should override this with a native async client call. The default
+        implementation calls the blocking `run_llm` directly, so concurrent calls do not overlap; it never
+        runs `run_llm` from worker threads, since local backends such as vLLM are not thread-safe.
+
+        Args:
+            prompt (Union[str, List[Dict[str, str]]]): The prompt to be processed by the model.
+
+        Returns:
+            Tuple[str, int]: A tuple object containing the text response and the number of tokens in the response,
+                optionally followed by the same extra elements as `run_llm`.
+        """
+        return self.run_llm(prompt, **kwargs)
+
+    async def close_async_clients(self) -> None:
+        """
+        Closes the clients opened by `run_llm_async`. Called at the end of every `rerank_all_async` run, since
+        their connections belong to that run's event loop, which `sliding_windows_concurrent` closes afterwards.
         """
         pass
 
+    def has_native_async(self) -> bool:
+        """
+        Returns whether this model overrides `run_llm_async` with a natively async call, i.e. whether
+        reranking queries concurrently through `sliding_windows_concurrent` actually overlaps LLM calls.
+        """
+        return type(self).run_llm_async is not RankLLM.run_llm_async
+
     @abstractmethod
     def create_prompt_batched(
         self, results: List[Result], rank_start: int, rank_end: int, batch_size: int
-    ) -> List[Tuple[Union[str, List[Dict[str, str]]], int]]:
+    ) -> Tuple[List[Union[str, List[Dict[str, str]]]], List[int]]:
         """
         Abstract method to create a batch of prompts based on the results and given ranking range.
 
@@ -117,6 +193,27 @@ class RankLLM(ABC):
         """
         pass
 
+    def cost_per_1k_cached_token(self) -> float:
+        """
+        Returns the cost per 1,000 input tokens served from the backend's prompt cache.
+        Defaults to the regular input token cost for backends without discounted cache pricing.
+
+        Returns:
+            float: The cost per 1,000 cached input tokens.
+        """
+        return self.cost_per_1k_token(input_token=True)
+
+    def num_cached_prefix_tokens(self) -> int:
+        """
+        Returns the number of input tokens of each prompt, after the first one, that the backend is expected
+        to serve from its prompt cache, i.e. the cacheable part of `_cached_prefix`.
+        Defaults to 0 for backends without discounted cache pricing.
+
+        Returns:
+            int: The estimated number of cached input tokens per prompt.
+        """
+        return 0
+
     @abstractmethod
     def num_output_tokens(self) -> int:
         """
@@ -127,6 +224,20 @@ class RankLLM(ABC):
         """
         pass
 
+    @abstractmethod
+    def get_total_output_tokens(self, use_alpha: bool, current_window_size: Optional[int] = None) -> int:
+        """
+        Abstract method to estimate the total number of tokens in the model's output for a window.
+
+        Args:
+            use_alpha (bool): Whether the ranking uses alphabetical identifiers.
+            current_window_size (Optional[int]): The size of the window, defaults to the configured window size.
+
+        Returns:
+            int: The estimated number of output tokens.
+        """
+        pass
+
     def permutation_pipeline(
         self,
         result: Result,
@@ -143,21 +254,21 @@ class RankLLM(ABC):
             result (Result): The result object to process.
             rank_start (int): The start index for ranking.
             rank_end (int): The end index for ranking.
-            logging (bool, optional): Flag to enable logging of operations. Defaults to False.
+            logging (bool, optional): Flag to enable debug logging of prompts and outputs. Defaults to False.
 
         Returns:
             Result: The processed result object after applying permutation.
         """
         prompt, in_token_count = self.create_prompt(result, use_alpha, rank_start, rank_end)
         if logging:
-            print(f"prompt: {prompt}\n")
-        permutation, out_token_count = self.run_llm(
+            logger.debug("prompt: %s\n", prompt)
+        permutation, out_token_count, *call_stats = self.run_llm(
             prompt, use_logits=use_logits, use_alpha=use_alpha, current_window_size=rank_end - rank_start
         )
         if logging:
-            print(f"output: {permutation}")
+            logger.debug("output: %s", permutation)
         ranking_exec_info = RankingExecInfo(
-            prompt, permutation, in_token_count, out_token_count
+            prompt, permutation, in_token_count, out_token_count, *call_stats
         )
         if result.ranking_exec_summary == None:
             result.ranking_exec_summary = []
@@ -180,28 +291,122 @@ class RankLLM(ABC):
             results (List[Result]): The list of result objects to process.
             rank_start (int): The start index for ranking.
             rank_end (int): The end index for ranking.
-            logging (bool, optional): Flag to enable logging of operations. Defaults to False.
+            logging (bool, optional): Flag to enable debug logging of prompts and outputs. Defaults to False.
+        Returns:
+            List[Result]: The processed list of result objects after applying permutation.
+        """
+        return self.permutation_pipeline_windows(
+            results, [(rank_start, rank_end)] * len(results), use_logits, use_alpha, logging
+        )
+
+    def permutation_pipeline_windows(
+        self,
+        results: List[Result],
+        windows: List[Tuple[int, int]],
+        use_logits: bool,
+        use_alpha: bool,
+        logging: bool = False,
+    ) -> List[Result]:
+        """
+        Runs the permutation pipeline for a batch of results, each within its own rank range.
+        Windows of the same size are submitted to the model in a single `run_llm_batched` call,
+        with identical prompts sent only once.
+        Args:
+            results (List[Result]): The list of result objects to process.
+            windows (List[Tuple[int, int]]): The (rank_start, rank_end) range to rerank for each result.
+            logging (bool, optional): Flag to enable debug logging of prompts and outputs. Defaults to False.
         Returns:
             List[Result]: The processed list of result objects after applying permutation.
         """
-        prompts = []
-        prompts = self.create_prompt_batched(results, use_alpha, rank_start, rank_end, batch_size=32)
-        batched_results = self.run_llm_batched([prompt for prompt, _ in prompts], use_logits=use_logits, use_alpha=use_alpha, current_window_size=rank_end - rank_start)
+        prompt_texts = [None] * len(results)
+        in_token_counts = [None] * len(results)
+        by_range = defaultdict(list)
+        for i, window in enumerate(windows):
+            by_range[window].append(i)
+        for (rank_start, rank_end), indices in by_range.items():
+            range_prompts, range_token_counts = self.create_prompt_batched(
+                [results[i] for i in indices], use_alpha, rank_start, rank_end, batch_size=32
+            )
+            for i, prompt, in_token_count in zip(indices, range_prompts, range_token_counts):
+                prompt_texts[i] = prompt
+                in_token_counts[i] = in_token_count
+
+        # The output budget only depends on the window size, so ranges of equal size share one generation call
+        batched_results = [None] * len(results)
+        by_size = defaultdict(list)
+        for i, (rank_start, rank_end) in enumerate(windows):
+            by_size[rank_end - rank_start].append(i)
+        for window_size, indices in by_size.items():
+            # Map every prompt to its first occurrence so duplicate prompts share one generation
+            keys = [
+                prompt_texts[i] if isinstance(prompt_texts[i], str) else json.dumps(prompt_texts[i], sort_keys=True)
+                for i in indices
+            ]
+            unique = {}
+            for i, key in zip(indices, keys):
+                unique.setdefault(key, i)
+            order = list(unique.values())
+            size_results = self.run_llm_batched(
+                [prompt_texts[i] for i in order], use_logits=use_logits, use_alpha=use_alpha, current_window_size=window_size
+            )
+            for i, size_result in zip(order, size_results):
+                batched_results[i] = size_result
+            for i, key in zip(indices, keys):
+                batched_results[i] = batched_results[unique[key]]
         #---------------------------------
-        for index, (result, (prompt, in_token_count)) in enumerate(zip(results, prompts)):
-            permutation, out_token_count = batched_results[index]
+        for i, result in enumerate(results):
+            permutation, out_token_count, *call_stats = batched_results[i]
             if logging:
-                print(f"output: {permutation}")
+                logger.debug("output: %s", permutation)
             ranking_exec_info = RankingExecInfo(
-                prompt, permutation, in_token_count, out_token_count
+                prompt_texts[i], permutation, in_token_counts[i], out_token_count, *call_stats
             )
             if result.ranking_exec_summary is None:
                 result.ranking_exec_summary = []
             result.ranking_exec_summary.append(ranking_exec_info)
+            rank_start, rank_end = windows[i]
             result = self.receive_permutation(result, permutation, rank_start, rank_end, use_alpha)
 
         return results
 
+    async def permutation_pipeline_async(
+        self,
+        result: Result,
+        use_logits: bool,
+        use_alpha: bool,
+        rank_start: int,
+        rank_end: int,
+        logging: bool = False,
+    ) -> Result:
+        """
+        Async counterpart of `permutation_pipeline`, awaiting `run_llm_async` for the model call.
+
+        Args:
+            result (Result): The result object to process.
+            rank_start (int): The start index for ranking.
+            rank_end (int): The end index for ranking.
+            logging (bool, optional): Flag to enable debug logging of prompts and outputs. Defaults to False.
+
+        Returns:
+            Result: The processed result object after applying permutation.
+        """
+        prompt, in_token_count = self.create_prompt(result, use_alpha, rank_start, rank_end)
+        if logging:
+            logger.debug("prompt: %s\n", prompt)
+        permutation, out_token_count, *call_stats = await self.run_llm_async(
+            prompt, use_logits=use_logits, use_alpha=use_alpha, current_window_size=rank_end - rank_start
+        )
+        if logging:
+            logger.debug("output: %s", permutation)
+        ranking_exec_info = RankingExecInfo(
+            prompt, permutation, in_token_count, out_token_count, *call_stats
+        )
+        if result.ranking_exec_summary == None:
+            result.ranking_exec_summary = []
+        result.ranking_exec_summary.append(ranking_exec_info)
+        result = self.receive_permutation(result, permutation, rank_start, rank_end, use_alpha)
+        return result
+
     def sliding_windows(
         self,
         retrieved_result: Result,
@@ -222,12 +427,12 @@ class RankLLM(ABC):
             rank_end (int): The end index for ranking.
             window_size (int): The size of each sliding window.
             step (int): The step size for moving the window.
-            logging (bool, optional): Flag to enable logging of operations. Defaults to False.
+            logging (bool, optional): Flag to enable debug logging of prompts and outputs. Defaults to False.
 
         Returns:
             Result: The result object after applying the sliding window technique.
         """
-        rerank_result = copy.deepcopy(retrieved_result)
+        rerank_result = retrieved_result.clone_for_rerank()
         end_pos = rank_end
         start_pos = rank_end - window_size
         # end_pos > rank_start ensures that the list is non-empty while allowing last window to be smaller than window_size
@@ -240,13 +445,13 @@ class RankLLM(ABC):
             end_pos = end_pos - step
             start_pos = start_pos - step
 
-        if hasattr(self, "acc_cost"):
-            print(f"Accumulated cost: ${self.acc_cost}")
+        if self._tracks_cost:
+            print(f"Accumulated cost: ${self._acc_cost}")
         return rerank_result
     
-    def sliding_windows_batched(
+    async def sliding_windows_async(
         self,
-        retrieved_results: List[Result],
+        retrieved_result: Result,
         use_logits: bool,
         use_alpha: bool,
         rank_start: int,
@@ -254,33 +459,186 @@ class RankLLM(ABC):
         window_size: int,
         step: int,
         logging: bool = False,
-    ) -> List[Result]:
+    ) -> Result:
         """
-        Applies the sliding window algorithm to the reranking process for a batch of result objects.
+        Async counterpart of `sliding_windows`. Windows of a single query are still processed in order,
+        since each window depends on the ordering produced by the previous one.
+
         Args:
-            retrieved_results (List[Result]): The list of result objects to process.
+            retrieved_result (Result): The result object to process.
             rank_start (int): The start index for ranking.
             rank_end (int): The end index for ranking.
             window_size (int): The size of each sliding window.
             step (int): The step size for moving the window.
-            logging (bool, optional): Flag to enable logging of operations. Defaults to False.
+            logging (bool, optional): Flag to enable debug logging of prompts and outputs. Defaults to False.
+
         Returns:
-            List[Result]: The list of result objects after applying the sliding window technique.
+            Result: The result object after applying the sliding window technique.
         """
-        rerank_results = [copy.deepcopy(result) for result in retrieved_results]
-
+        rerank_result = retrieved_result.clone_for_rerank()
         end_pos = rank_end
         start_pos = rank_end - window_size
-        
-        # end_pos > rank_start ensures that the list is non-empty while allowing last window to be smaller than window_size
-        # start_pos + step != rank_start prevents processing of redundant windows (e.g. 0-20, followed by 0-10)
         while end_pos > rank_start and start_pos + step != rank_start:
             start_pos = max(start_pos, rank_start)
-            rerank_results = self.permutation_pipeline_batched(
-                rerank_results, use_logits, use_alpha, start_pos, end_pos, logging
+            rerank_result = await self.permutation_pipeline_async(
+                rerank_result, use_logits, use_alpha, start_pos, end_pos, logging
             )
             end_pos = end_pos - step
             start_pos = start_pos - step
+        return rerank_result
+
+    async def rerank_all_async(
+        self,
+        retrieved_results: List[Result],
+        use_logits: bool,
+        use_alpha: bool,
+        rank_start: int,
+        rank_end: int,
+        window_size: int,
+        step: int,
+        logging: bool = False,
+        num_parallel: int = NUM_PARALLEL,
+        on_result_done: Optional[Callable[[int, Result], None]] = None,
+    ) -> List[Result]:
+        """
+        Runs `sliding_windows_async` for every result concurrently, with at most `num_parallel` queries in flight.
+        Args:
+            retrieved_results (List[Result]): The list of result objects to process.
+            rank_start (int): The start index for ranking.
+            rank_end (int): The end index for ranking, clamped to the number of hits of each result.
+            window_size (int): The size of each sliding window.
+            step (int): The step size for moving the window.
+            logging (bool, optional): Flag to enable debug logging of prompts and outputs. Defaults to False.
+            num_parallel (int, optional): Maximum number of queries reranked concurrently. Defaults to NUM_PARALLEL.
+            on_result_done (Callable[[int, Result], None], optional): Called with the input index and the reranked
+                result as soon as each query finishes. Defaults to None.
+        Returns:
+            List[Result]: The list of result objects after applying the sliding window technique, in input order.
+        """
+        sem = asyncio.Semaphore(max(num_parallel, 1))
+
+        async def bounded(index: int, result: Result) -> Result:
+            async with sem:
+                rerank_result = await self.sliding_windows_async(
+                    result,
+                    use_logits,
+                    use_alpha,
+                    rank_start,
+                    min(rank_end, len(result.hits)),
+                    window_size,
+                    step,
+                    logging,
+                )
+            if on_result_done is not None:
+                on_result_done(index, rerank_result)
+            return rerank_result
+
+        try:
+            return await asyncio.gather(*[bounded(index, result) for index, result in enumerate(retrieved_results)])
+        finally:
+            await self.close_async_clients()
+
+    def sliding_windows_concurrent(
+        self,
+        retrieved_results: List[Result],
+        use_logits: bool,
+        use_alpha: bool,
+        rank_start: int,
+        rank_end: int,
+        window_size: int,
+        step: int,
+        logging: bool = False,
+        num_parallel: int = NUM_PARALLEL,
+        on_result_done: Optional[Callable[[int, Result], None]] = None,
+    ) -> List[Result]:
+        """
+        Synchronous wrapper around `rerank_all_async`, overlapping LLM round-trips across queries.
+        Args:
+            retrieved_results (List[Result]): The list of result objects to process.
+            rank_start (int): The start index for ranking.
+            rank_end (int): The end index for ranking.
+            window_size (int): The size of each sliding window.
+            step (int): The step size for moving the window.
+            logging (bool, optional): Flag to enable debug logging of prompts and outputs. Defaults to False.
+            num_parallel (int, optional): Maximum number of queries reranked concurrently. Defaults to NUM_PARALLEL.
+            on_result_done (Callable[[int, Result], None], optional): Called with the input index and the reranked
+                result as soon as each query finishes. Defaults to None.
+        Returns:
+            List[Result]: The list of result objects after applying the sliding window technique.
+        """
+        rerank_results = asyncio.run(
+            self.rerank_all_async(
+                retrieved_results,
+                use_logits,
+                use_alpha,
+                rank_start,
+                rank_end,
+                window_size,
+                step,
+                logging,
+                num_parallel,
+                on_result_done,
+            )
+        )
+        if self._tracks_cost:
+            print(f"Accumulated cost: ${self._acc_cost}")
+        return rerank_results
+
+    def sliding_windows_batched(
+        self,
+        retrieved_results: List[Result],
+        use_logits: bool,
+        use_alpha: bool,
+        rank_start: int,
+        rank_end: int,
+        window_size: int,
+        step: int,
+        logging: bool = False,
+        max_in_flight: Optional[int] = None,
+    ) -> List[Result]:
+        """
+        Applies the sliding window algorithm to the reranking process for a batch of result objects.
+
+        Every query walks through its own windows, bounded by its own number of hits. Queries whose previous
+        window has been applied are queued for their next window, and each round submits up to `max_in_flight`
+        queued windows together through `permutation_pipeline_windows`.
+        Args:
+            retrieved_results (List[Result]): The list of result objects to process.
+            rank_start (int): The start index for ranking.
+            rank_end (int): The end index for ranking, clamped to the number of hits of each result.
+            window_size (int): The size of each sliding window.
+            step (int): The step size for moving the window.
+            logging (bool, optional): Flag to enable debug logging of prompts and outputs. Defaults to False.
+            max_in_flight (int, optional): Maximum number of windows submitted per round. Defaults to all queued windows.
+        Returns:
+            List[Result]: The list of result objects after applying the sliding window technique.
+        """
+        rerank_results = [result.clone_for_rerank() for result in retrieved_results]
+
+        # Queue of (result index, start_pos, end_pos) for the next window of every unfinished query
+        ready = deque()
+
+        def enqueue(index: int, end_pos: int, start_pos: int) -> None:
+            # end_pos > rank_start ensures that the list is non-empty while allowing last window to be smaller than window_size
+            # start_pos + step != rank_start prevents processing of redundant windows (e.g. 0-20, followed by 0-10)
+            if end_pos > rank_start and start_pos + step != rank_start:
+                ready.append((index, max(start_pos, rank_start), end_pos))
+
+        for index, result in enumerate(rerank_results):
+            end_pos = min(rank_end, len(result.hits))
+            enqueue(index, end_pos, end_pos - window_size)
+
+        while ready:
+            in_flight = [ready.popleft() for _ in range(min(len(ready), max_in_flight or len(ready)))]
+            self.permutation_pipeline_windows(
+                [rerank_results[index] for index, _, _ in in_flight],
+                [(start_pos, end_pos) for _, start_pos, end_pos in in_flight],
+                use_logits,
+                use_alpha,
+                logging,
+            )
+            for index, start_pos, end_pos in in_flight:
+                enqueue(index, end_pos - step, start_pos - step)
         return rerank_results
 
     def get_ranking_cost_upperbound(
@@ -318,9 +676,11 @@ class RankLLM(ABC):
         rank_end: int,
         window_size: int,
         step: int,
+        use_alpha: bool = False,
     ) -> Tuple[float, int]:
         """
         Calculates the ranking cost based on actual token counts from generated prompts.
+        The cacheable part of the shared prompt prefix is billed at the cached token rate for every prompt after the first.
 
         Args:
             retrieved_results (List[Dict[str, Any]]): A list of retrieved results for processing.
@@ -328,12 +688,14 @@ class RankLLM(ABC):
             rank_end (int): The end index for ranking.
             window_size (int): The size of each sliding window.
             step (int): The step size for moving the window.
+            use_alpha (bool, optional): Whether prompts use alphabetical identifiers. Defaults to False.
 
         Returns:
             Tuple[float, int]: A tuple object containing the calculated cost and the total number of tokens used (input tokens + output tokens).
         """
         input_token_count = 0
         output_token_count = 0
+        num_prompts = 0
         # Go through the retrieval result using the sliding window and count the number of tokens for generated prompts.
         # This is an estimated cost analysis since the actual prompts' length will depend on the ranking.
         for result in tqdm(retrieved_results):
@@ -341,34 +703,39 @@ class RankLLM(ABC):
             start_pos = rank_end - window_size
             while start_pos >= rank_start:
                 start_pos = max(start_pos, rank_start)
-                prompt, _ = self.create_prompt(result, start_pos, end_pos)
-                input_token_count += self.get_num_tokens(prompt)
+                # create_prompt already tokenizes the final prompt to fit it into the context, so reuse its count
+                _, num_tokens = self.create_prompt(result, use_alpha, start_pos, end_pos)
+                input_token_count += num_tokens
+                output_token_count += self.get_total_output_tokens(use_alpha, end_pos - start_pos)
+                num_prompts += 1
                 end_pos = end_pos - step
                 start_pos = start_pos - step
-                output_token_count += self.num_output_tokens()
+        cached_token_count = max(num_prompts - 1, 0) * self.num_cached_prefix_tokens()
         cost = (
-            input_token_count * self.cost_per_1k_token(input_token=True)
+            (input_token_count - cached_token_count) * self.cost_per_1k_token(input_token=True)
+            + cached_token_count * self.cost_per_1k_cached_token()
             + output_token_count * self.cost_per_1k_token(input_token=False)
         ) / 1000.0
         return (cost, input_token_count + output_token_count)
     
     def parse_reasoning_permutation(self, response: str) -> str:
-        ranked_list_pattern=r"\s*(\[\d+\](?:\s*>\s*\[\d+\])*)\s*"
         end_of_reasoning_tag = "</think>"
         start_of_answer_tag = "<answer>"
         end_of_answer_tag = "</answer>"
+        # Both a closing think tag and a ranked list contain ">", so without it nothing below can match
+        if ">" not in response:
+            return response, False
         matched_ranked_list = None
         if end_of_answer_tag in response and end_of_reasoning_tag in response:
             parsed_answer = response[response.index(end_of_reasoning_tag):response.index(end_of_answer_tag)].replace(start_of_answer_tag, '').strip()
-            match = re.findall(ranked_list_pattern, parsed_answer)
+            match = _RANKED_LIST_RE.findall(parsed_answer)
             if match:
-                print(len(match))
                 matched_ranked_list = match[0].strip()
         if matched_ranked_list:
-            print(f"re matched output: {matched_ranked_list}")
+            logger.debug("re matched output: %s", matched_ranked_list)
             return matched_ranked_list, True
         else:
-            match = re.findall(ranked_list_pattern, response, re.DOTALL | re.MULTILINE)
+            match = _RANKED_LIST_RE_MULTI.findall(response)
             first_correct_match = None
             for cand in match:
                 if ">" not in cand:
@@ -378,41 +745,56 @@ class RankLLM(ABC):
                     break
             
             if first_correct_match:
-                print(f"re matched output: {first_correct_match}")
+                logger.debug("re matched output: %s", first_correct_match)
                 return first_correct_match, True
             else:
-                print(f"re match FAILED: {response}")
+                logger.debug("re match FAILED: %s", response)
                 return response, False
 
-    def _clean_response(self, response: str, use_alpha: bool) -> str:
-        ### parse clean permutation from model response with reasoning
-        if self._rerank_type == "code_reasoning":
-            response, _ = self.parse_reasoning_permutation(response)
+    def _make_clean_fn(self):
+        """
+        Returns `_clean_response` specialized to this reranker's `_rerank_type`, so the per-response
+        rerank type check and attribute lookups are resolved once.
+        """
+        digit_table = self._digit_table
+        alpha_table = self._alpha_table
 
-        new_response = ""
-        if use_alpha:
-            for c in response:
-                if not c.isalpha():
-                    new_response += " "
-                else:
-                    new_response += str(ord(c) - ALPH_START_IDX)
-            new_response = new_response.strip()
-        else:
-            for c in response:
-                if not c.isdigit():
-                    new_response += " "
-                else:
-                    new_response += c
-            new_response = new_response.strip()
-            
-        return new_response
+        def _clean_ranking_response(response: str, use_alpha: bool) -> str:
+            return response.translate(alpha_table if use_alpha else digit_table).strip()
+
+        if self._rerank_type != "code_reasoning":
+            return _clean_ranking_response
+        parse_reasoning_permutation = self.parse_reasoning_permutation
+
+        def _clean_reasoning_response(response: str, use_alpha: bool) -> str:
+            ### parse clean permutation from model response with reasoning
+            response, _ = parse_reasoning_permutation(response)
+            return _clean_ranking_response(response, use_alpha)
 
-    def _remove_duplicate(self, response: List[int]) -> List[int]:
-        new_response = []
-        for c in response:
-            if c not in new_response:
-                new_response.append(c)
-        return new_response
+        return _clean_reasoning_response
+
+    def _clean_response(self, response: str, use_alpha: bool) -> str:
+        # Specialized on first use, once the subclass has set _rerank_type; the bound closure then
+        # shadows this method for the rest of the instance's lifetime
+        self._clean_response = self._make_clean_fn()
+        return self._clean_response(response, use_alpha)
+
+    def _parse_permutation(self, permutation: str, window_size: int, use_alpha: bool) -> List[int]:
+        """
+        Parses a model response into a 0-based ordering of all `window_size` positions in a single pass.
+        Out-of-window and repeated ids are dropped, and positions the response does not mention are appended
+        in their original order.
+        """
+        cleaned = self._clean_response(permutation, use_alpha)
+        seen = [False] * window_size
+        response = []
+        for match in _NUMBER_RE.finditer(cleaned):
+            idx = int(match.group()) - 1
+            if 0 <= idx < window_size and not seen[idx]:
+                seen[idx] = True
+                response.append(idx)
+        response.extend(idx for idx in range(window_size) if not seen[idx])
+        return response
 
     def receive_permutation(
         self, result: Result, permutation: str, rank_start: int, rank_end: int, use_alpha: bool
@@ -442,23 +824,22 @@ class RankLLM(ABC):
             Items not mentioned in the permutation string remain in their original sequence but are moved after
             the permuted items.
         """
-        response = self._clean_response(permutation, use_alpha)
-        response = [int(x) - 1 for x in response.split()]
-        response = self._remove_duplicate(response)
-        cut_range = copy.deepcopy(result.hits[rank_start:rank_end])
-        original_rank = [tt for tt in range(len(cut_range))]
-        response = [ss for ss in response if ss in original_rank]
-        response = response + [tt for tt in original_rank if tt not in response]
-        for j, x in enumerate(response):
-            result.hits[j + rank_start] = copy.deepcopy(cut_range[x])
-            if "rank" in result.hits[j + rank_start]:
-                result.hits[j + rank_start]["rank"] = cut_range[j]["rank"]
-            if "score" in result.hits[j + rank_start]:
-                result.hits[j + rank_start]["score"] = cut_range[j]["score"]
+        cut_range = result.hits[rank_start:rank_end]
+        response = self._parse_permutation(permutation, len(cut_range), use_alpha)
+        # Ranks and scores belong to positions, only the hits move, so read them before any hit is rewritten
+        cut_ranks = [hit.get("rank") for hit in cut_range]
+        cut_scores = [hit.get("score") for hit in cut_range]
+        reordered = [cut_range[x] for x in response]
+        for hit, rank, score in zip(reordered, cut_ranks, cut_scores):
+            if "rank" in hit:
+                hit["rank"] = rank
+            if "score" in hit:
+                hit["score"] = score
+        result.hits[rank_start:rank_end] = reordered
         return result
 
     def _replace_number(self, s: str, use_alpha) -> str:
         if use_alpha:
-            return re.sub(r"\[([A-z]+)\]", r"(\1)", s)
+            return _REPLACE_ALPHA_RE.sub(r"(\1)", s)
         else:
-            return re.sub(r"\[(\d+)\]", r"(\1)", s)
+            return _REPLACE_NUM_RE.sub(r"(\1)", s)
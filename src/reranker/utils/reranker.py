@@ -1,6 +1,6 @@
 from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 import os
 import time
 
@@ -23,7 +23,9 @@ class Reranker:
         window_size: int = 20,
         step: int = 10,
         logging: bool = False,
-        batched: bool = False
+        batched: bool = False,
+        num_parallel: int = 1,
+        max_in_flight: Optional[int] = None,
     ) -> List[Result]:
         """
         Reranks a list of retrieved results using the RankLLM agent.
@@ -38,6 +40,10 @@ class Reranker:
             window_size (int, optional): The size of each sliding window. Defaults to 20.
             step (int, optional): The step size for moving the window. Defaults to 10.
             logging (bool, optional): Enables logging of the reranking process. Defaults to False.
+            num_parallel (int, optional): Number of queries reranked concurrently through the async path when greater than 1.
+                Only used by agents with a native `run_llm_async`; other agents rerank sequentially. Defaults to 1.
+            max_in_flight (int, optional): Maximum number of windows submitted to the model per round when batched.
+                Defaults to all queued windows.
 
         Returns:
             List[Result]: A list containing the reranked results.
@@ -48,10 +54,24 @@ class Reranker:
                 use_logits=use_logits,
                 use_alpha=use_alpha,
                 rank_start=max(rank_start, 0),
-                rank_end=min(rank_end, len(retrieved_results[0].hits)), #TODO: Fails arbitrary hit sizes
+                rank_end=rank_end,
                 window_size=window_size,
                 step=step,
                 logging=logging,
+                max_in_flight=max_in_flight,
+            )
+
+        if num_parallel > 1 and self._agent.has_native_async():
+            return self._rerank_concurrent(
+                retrieved_results,
+                use_logits=use_logits,
+                use_alpha=use_alpha,
+                rank_start=max(rank_start, 0),
+                rank_end=rank_end,
+                window_size=window_size,
+                step=step,
+                logging=logging,
+                num_parallel=num_parallel,
             )
 
         rerank_results = []
@@ -71,11 +91,9 @@ class Reranker:
             rerank_results.append(rerank_result)
             histories.append(self._agent._history)
             
-            if hasattr(self._agent, "_curr_cost"):
+            if self._agent._tracks_cost:
                 print(f"Current run cost: {self._agent._curr_cost}")
                 curr_costs.append(self._agent._curr_cost)
-            if hasattr(self._agent, "_acc_cost"):
-                print(f"Accumulated cost: {self._agent._acc_cost}")
 
         histories = {
             "run_history": histories,
@@ -83,3 +101,59 @@ class Reranker:
         if len(curr_costs) > 0:
             histories["run_costs"] = curr_costs
         return rerank_results, histories
+
+    def _rerank_concurrent(
+        self,
+        retrieved_results: List[Result],
+        use_logits: bool,
+        use_alpha: bool,
+        rank_start: int,
+        rank_end: int,
+        window_size: int,
+        step: int,
+        logging: bool,
+        num_parallel: int,
+    ) -> List[Result]:
+        """
+        Reranks the results with up to `num_parallel` queries in flight, keeping the per-query histories
+        layout of the sequential path: one run history and one running cost total per query, in input order.
+        """
+        query_histories = [None] * len(retrieved_results)
+        query_costs = [0] * len(retrieved_results)
+        start_cost = self._agent._curr_cost if self._agent._tracks_cost else 0
+
+        def on_result_done(index: int, rerank_result: Result) -> None:
+            # Windows of different queries interleave in the agent's history, so take each query's own windows
+            query_histories[index] = [
+                {"prompt": info.prompt, "response": info.response}
+                for info in rerank_result.ranking_exec_summary or []
+            ]
+            # Queries finish out of order, so sum each query's own calls instead of reading the agent's running total
+            query_costs[index] = sum(info.cost for info in rerank_result.ranking_exec_summary or [])
+            if self._agent._tracks_cost:
+                print(f"Current run cost: {self._agent._curr_cost}")
+
+        rerank_results = self._agent.sliding_windows_concurrent(
+            retrieved_results,
+            use_logits=use_logits,
+            use_alpha=use_alpha,
+            rank_start=rank_start,
+            rank_end=rank_end,
+            window_size=window_size,
+            step=step,
+            logging=logging,
+            num_parallel=num_parallel,
+            on_result_done=on_result_done,
+        )
+        histories = {
+            "run_history": query_histories,
+        }
+        if self._agent._tracks_cost:
+            # Running totals through each query in input order, as recorded by the sequential path
+            curr_costs = []
+            curr_cost = start_cost
+            for query_cost in query_costs:
+                curr_cost += query_cost
+                curr_costs.append(curr_cost)
+            histories["run_costs"] = curr_costs
+        return rerank_results, histories
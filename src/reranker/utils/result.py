@@ -4,12 +4,22 @@ from typing import Any, Dict, List
 
 class RankingExecInfo:
     def __init__(
-        self, prompt, response: str, input_token_count: int, output_token_count: int
+        self,
+        prompt,
+        response: str,
+        input_token_count: int,
+        output_token_count: int,
+        cached_token_count: int = 0,
+        cost: float = 0.0,
     ):
         self.prompt = prompt
         self.response = response
         self.input_token_count = input_token_count
         self.output_token_count = output_token_count
+        # Input tokens the backend served from its prompt / prefix cache
+        self.cached_token_count = cached_token_count
+        # API cost of this call, for backends that track cost
+        self.cost = cost
 
     def __repr__(self):
         return str(self.__dict__)
@@ -26,6 +36,13 @@ class Result:
         self.hits = hits
         self.ranking_exec_summary = ranking_exec_summary
 
+    def clone_for_rerank(self) -> "Result":
+        """
+        Returns a copy to rerank without modifying this result. Reranking only reorders hits and rewrites their
+        rank / score, so hit dicts are copied shallowly and their contents are shared with this result.
+        """
+        return Result(query=self.query, hits=[dict(hit) for hit in self.hits])
+
     def __repr__(self):
         return str(self.__dict__)
 